@@ -0,0 +1,672 @@
+"""Unit tests for the caches and helpers behind PromptEnhancer.
+
+The Gemini client is replaced with a small fake, so no network access or
+real API key is needed.
+"""
+
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pytest
+
+import wan_prompt_enhancer
+from wan_prompt_enhancer import PromptEnhancer, ResponseCache, SemanticCache
+
+
+def make_response(text: str, finish_reason: str = "STOP") -> SimpleNamespace:
+    """Build an object shaped like a google-genai GenerateContentResponse."""
+    candidate = SimpleNamespace(finish_reason=SimpleNamespace(name=finish_reason))
+    return SimpleNamespace(text=text, candidates=[candidate])
+
+
+def make_chunk(text: str, finish_reason: Optional[str] = None) -> SimpleNamespace:
+    """Build one streamed chunk; only the last one carries a finish reason."""
+    reason = SimpleNamespace(name=finish_reason) if finish_reason else None
+    return SimpleNamespace(text=text, candidates=[SimpleNamespace(finish_reason=reason)])
+
+
+class FakeModels:
+    """Stands in for client.models, returning queued responses in order.
+
+    Setting reply instead builds each response from the request contents,
+    for tests whose requests may run in any order.
+    """
+
+    def __init__(self) -> None:
+        self.responses: List[Any] = []
+        self.reply: Optional[Callable[[str], Any]] = None
+        self.streams: List[List[Any]] = []
+        self.calls: List[str] = []
+        self.vectors: Dict[str, List[float]] = {}
+
+    def generate_content(self, model: str, contents: Any, config: Any) -> SimpleNamespace:
+        self.calls.append(model)
+        response = self.reply(contents) if self.reply else self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def generate_content_stream(self, model: str, contents: Any, config: Any) -> Iterator[Any]:
+        self.calls.append(model)
+        for chunk in self.streams.pop(0):
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+    def embed_content(self, model: str, contents: List[str], config: Any) -> SimpleNamespace:
+        return SimpleNamespace(
+            embeddings=[SimpleNamespace(values=self.vectors[text]) for text in contents]
+        )
+
+
+class FakeAsyncModels:
+    """Stands in for client.aio.models, sharing the sync fake's responses."""
+
+    def __init__(self, models: FakeModels) -> None:
+        self.models = models
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_content(self, model: str, contents: Any, config: Any) -> SimpleNamespace:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Yield so that concurrent requests actually overlap
+            await asyncio.sleep(0.01)
+            return self.models.generate_content(model, contents, config)
+        finally:
+            self.in_flight -= 1
+
+
+class FakeFiles:
+    """Stands in for client.files, capturing uploaded JSONL requests."""
+
+    def __init__(self) -> None:
+        self.uploaded: List[Dict[str, Any]] = []
+        self.downloads: Dict[str, bytes] = {}
+
+    def upload(self, file: str, config: Any) -> SimpleNamespace:
+        with open(file, encoding="utf-8") as f:
+            self.uploaded = [json.loads(line) for line in f]
+        return SimpleNamespace(name="files/batch-input")
+
+    def download(self, file: str) -> bytes:
+        return self.downloads[file]
+
+
+class FakeBatches:
+    """Stands in for client.batches, replaying queued job snapshots."""
+
+    def __init__(self) -> None:
+        self.created: List[Dict[str, Any]] = []
+        self.jobs: List[SimpleNamespace] = []
+        self.cancelled: List[str] = []
+
+    def create(self, model: str, src: str, config: Any) -> SimpleNamespace:
+        self.created.append({"model": model, "src": src})
+        return SimpleNamespace(name="batches/123")
+
+    def get(self, name: str) -> SimpleNamespace:
+        return self.jobs.pop(0)
+
+    def cancel(self, name: str) -> None:
+        self.cancelled.append(name)
+
+
+def make_job(state: str, dest: Any = None) -> SimpleNamespace:
+    """Build an object shaped like a google-genai BatchJob snapshot."""
+    return SimpleNamespace(state=SimpleNamespace(name=state), dest=dest, error=None)
+
+
+@pytest.fixture
+def clean_env(monkeypatch: pytest.MonkeyPatch) -> pytest.MonkeyPatch:
+    """Clear the settings PromptEnhancer reads from the environment."""
+    # Keep a developer's local .env from leaking settings into the tests
+    monkeypatch.setattr(wan_prompt_enhancer, "_dotenv_loaded", True)
+    for name in ("GEMINI_MODEL", "GEMINI_FAST_MODEL", "WAN_CACHE_SIM", "GEMINI_THINKING_BUDGET"):
+        monkeypatch.delenv(name, raising=False)
+    return monkeypatch
+
+
+def build_enhancer(cache_dir: Any) -> PromptEnhancer:
+    instance = PromptEnhancer(api_key="test-key", cache_dir=str(cache_dir))
+    models = FakeModels()
+    instance.client = SimpleNamespace(
+        models=models,
+        aio=SimpleNamespace(models=FakeAsyncModels(models)),
+        files=FakeFiles(),
+        batches=FakeBatches(),
+    )
+    return instance
+
+
+@pytest.fixture
+def enhancer(tmp_path: Any, clean_env: pytest.MonkeyPatch) -> PromptEnhancer:
+    """A PromptEnhancer with a fake client and a temporary cache directory."""
+    return build_enhancer(tmp_path)
+
+
+@pytest.fixture
+def semantic_enhancer(tmp_path: Any, clean_env: pytest.MonkeyPatch) -> PromptEnhancer:
+    """Like enhancer, with the semantic cache enabled at a 0.9 threshold."""
+    clean_env.setenv("WAN_CACHE_SIM", "0.9")
+    return build_enhancer(tmp_path)
+
+
+class TestResponseCache:
+    def test_miss_returns_none(self, tmp_path: Any) -> None:
+        cache = ResponseCache(str(tmp_path))
+        assert cache.get(("model", "prompt")) is None
+
+    def test_round_trip_through_disk(self, tmp_path: Any) -> None:
+        ResponseCache(str(tmp_path)).set(("model", "prompt"), "enhanced")
+
+        # A fresh instance has an empty memory tier, so this hit comes from disk
+        assert ResponseCache(str(tmp_path)).get(("model", "prompt")) == "enhanced"
+
+    def test_memory_tier_evicts_least_recently_used(self, tmp_path: Any) -> None:
+        cache = ResponseCache(str(tmp_path), maxsize=2)
+        cache.set(("a",), "1")
+        cache.set(("b",), "2")
+        cache.get(("a",))
+        cache.set(("c",), "3")
+
+        assert list(cache._memory) == [cache.digest(("a",)), cache.digest(("c",))]
+        # The evicted entry is still served from disk
+        assert cache.get(("b",)) == "2"
+
+    def test_unwritable_directory_still_uses_memory(self, tmp_path: Any) -> None:
+        blocker = tmp_path / "file"
+        blocker.write_text("not a directory")
+        cache = ResponseCache(str(blocker / "cache"))
+        cache.set(("key",), "value")
+
+        assert cache.get(("key",)) == "value"
+
+
+class TestSemanticCache:
+    def test_similar_vector_hits(self, tmp_path: Any) -> None:
+        cache = SemanticCache(str(tmp_path), threshold=0.9)
+        cache.add(("ns",), [1.0, 0.0], "cached")
+
+        assert cache.lookup(("ns",), [0.99, 0.05]) == "cached"
+
+    def test_dissimilar_vector_misses(self, tmp_path: Any) -> None:
+        cache = SemanticCache(str(tmp_path), threshold=0.9)
+        cache.add(("ns",), [1.0, 0.0], "cached")
+
+        assert cache.lookup(("ns",), [0.0, 1.0]) is None
+
+    def test_namespaces_are_isolated(self, tmp_path: Any) -> None:
+        cache = SemanticCache(str(tmp_path), threshold=0.9)
+        cache.add(("flash",), [1.0, 0.0], "cached")
+
+        assert cache.lookup(("pro",), [1.0, 0.0]) is None
+
+    def test_round_trip_through_single_file(self, tmp_path: Any) -> None:
+        SemanticCache(str(tmp_path), threshold=0.9).add(("ns",), [1.0, 0.0], "cached")
+
+        assert [path.suffix for path in tmp_path.iterdir()] == [".npz"]
+        assert SemanticCache(str(tmp_path), threshold=0.9).lookup(("ns",), [1.0, 0.0]) == "cached"
+
+    def test_failed_write_keeps_previous_file(
+        self, tmp_path: Any, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        SemanticCache(str(tmp_path), threshold=0.9).add(("ns",), [1.0, 0.0], "first")
+
+        def crash(*args: Any, **kwargs: Any) -> None:
+            raise OSError("disk full")
+
+        cache = SemanticCache(str(tmp_path), threshold=0.9)
+        monkeypatch.setattr(cache._np, "savez", crash)
+        cache.add(("ns",), [0.0, 1.0], "second")
+        monkeypatch.undo()
+
+        assert [path.suffix for path in tmp_path.iterdir()] == [".npz"]
+        reloaded = SemanticCache(str(tmp_path), threshold=0.9)
+        assert reloaded.lookup(("ns",), [1.0, 0.0]) == "first"
+        assert reloaded.lookup(("ns",), [0.0, 1.0]) is None
+
+    def test_dimension_change_resets_namespace(self, tmp_path: Any) -> None:
+        cache = SemanticCache(str(tmp_path), threshold=0.9)
+        cache.add(("ns",), [1.0, 0.0], "old")
+        cache.add(("ns",), [1.0, 0.0, 0.0], "new")
+
+        assert cache.lookup(("ns",), [1.0, 0.0]) is None
+        assert cache.lookup(("ns",), [1.0, 0.0, 0.0]) == "new"
+
+
+class TestEnhancePromptCaching:
+    def test_repeat_prompt_is_served_from_cache(self, enhancer: PromptEnhancer) -> None:
+        enhancer.client.models.responses.append(make_response("1. Golden hour"))
+
+        assert enhancer.enhance_prompt("a cat") == "1. Golden hour"
+        assert enhancer.enhance_prompt("  A Cat ") == "1. Golden hour"
+        assert len(enhancer.client.models.calls) == 1
+
+    def test_disabled_cache_always_calls_gemini(
+        self, enhancer: PromptEnhancer
+    ) -> None:
+        enhancer.cache = None
+        enhancer.client.models.responses.extend(
+            [make_response("1. Golden hour"), make_response("1. Blue hour")]
+        )
+
+        assert enhancer.enhance_prompt("a cat") == "1. Golden hour"
+        assert enhancer.enhance_prompt("a cat") == "1. Blue hour"
+
+    def test_truncated_response_is_flagged_and_not_cached(self, enhancer: PromptEnhancer) -> None:
+        enhancer.client.models.responses.extend(
+            [make_response("1. Gold", "MAX_TOKENS"), make_response("1. Golden hour")]
+        )
+
+        result = enhancer.enhance_prompt("a cat")
+        assert result == f"1. Gold\n\n{wan_prompt_enhancer._TRUNCATED_NOTICE}"
+        assert enhancer.enhance_prompt("a cat") == "1. Golden hour"
+
+    def test_truncated_async_response_is_flagged(self, enhancer: PromptEnhancer) -> None:
+        enhancer.client.models.responses.append(make_response("1. Gold", "MAX_TOKENS"))
+
+        result = enhancer.run(enhancer.enhance_prompt_async("a cat"))
+        assert result.endswith("(raise WAN_MAX_TOKENS for longer output)")
+
+    def test_truncated_stream_prints_notice(
+        self, enhancer: PromptEnhancer, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        enhancer.client.models.streams.append([make_chunk("1. Gold", "MAX_TOKENS")])
+
+        enhancer.enhance_prompt("a cat", stream=True)
+        assert capsys.readouterr().out == f"1. Gold\n{wan_prompt_enhancer._TRUNCATED_NOTICE}\n"
+
+    def test_empty_prompt_is_rejected(self, enhancer: PromptEnhancer) -> None:
+        assert enhancer.enhance_prompt("   ").startswith("❌")
+        assert enhancer.client.models.calls == []
+
+    def test_semantic_hit_is_not_promoted_to_exact_cache(
+        self, semantic_enhancer: PromptEnhancer
+    ) -> None:
+        enhancer = semantic_enhancer
+        models = enhancer.client.models
+        models.vectors.update({"a cat": [1.0, 0.0], "a kitten": [0.99, 0.05]})
+        models.responses.append(make_response("1. Golden hour"))
+
+        assert enhancer.enhance_prompt("a cat") == "1. Golden hour"
+        assert enhancer.enhance_prompt("a kitten") == "1. Golden hour"
+
+        # With semantic matching off, the near match must not be served
+        enhancer.semantic_cache = None
+        models.responses.append(make_response("1. Kitten close-up"))
+        assert enhancer.enhance_prompt("a kitten") == "1. Kitten close-up"
+
+
+class TestEnhanceAsync:
+    def test_async_result_is_cached_for_sync_calls(self, enhancer: PromptEnhancer) -> None:
+        enhancer.client.models.responses.append(make_response("1. Golden hour"))
+
+        assert enhancer.run(enhancer.enhance_prompt_async("a cat")) == "1. Golden hour"
+        assert enhancer.enhance_prompt("a cat") == "1. Golden hour"
+        assert len(enhancer.client.models.calls) == 1
+
+    def test_async_error_is_returned_as_message(self, enhancer: PromptEnhancer) -> None:
+        enhancer.client.models.responses.append(RuntimeError("quota exceeded"))
+
+        result = enhancer.run(enhancer.enhance_prompt_async("a cat"))
+        assert result.startswith("❌") and "quota exceeded" in result
+
+    def test_batch_keeps_order_and_bounds_concurrency(self, enhancer: PromptEnhancer) -> None:
+        enhancer.client.models.reply = make_response
+        prompts = [f"prompt number {i}" for i in range(6)]
+
+        results = enhancer.run(enhancer.enhance_batch(prompts, concurrency=2))
+
+        assert [prompt in result for prompt, result in zip(prompts, results)] == [True] * 6
+        assert enhancer.client.aio.models.max_in_flight == 2
+
+
+class TestBatchEntryText:
+    def test_extracts_text_and_completeness(self) -> None:
+        entry = {
+            "key": "prompt-0",
+            "response": {
+                "candidates": [
+                    {"content": {"parts": [{"text": "1. "}, {"text": "Golden hour"}]}, "finishReason": "STOP"}
+                ]
+            },
+        }
+        assert PromptEnhancer._batch_entry_text(entry) == ("1. Golden hour", True)
+
+    def test_truncated_entry_is_incomplete(self) -> None:
+        entry = {
+            "response": {
+                "candidates": [{"content": {"parts": [{"text": "1. Gold"}]}, "finishReason": "MAX_TOKENS"}]
+            }
+        }
+        assert PromptEnhancer._batch_entry_text(entry) == ("1. Gold", False)
+
+    def test_error_entry(self) -> None:
+        text, complete = PromptEnhancer._batch_entry_text({"error": {"code": 429}})
+        assert text.startswith("❌") and not complete
+
+    def test_unexpected_shape(self) -> None:
+        text, complete = PromptEnhancer._batch_entry_text({"response": {"candidates": []}})
+        assert text == "❌ Error: Unexpected batch result format." and not complete
+
+
+class TestBatchJob:
+    def test_submit_writes_one_request_per_prompt(self, enhancer: PromptEnhancer) -> None:
+        assert enhancer.submit_batch(["a cat", "a dog"]) == "batches/123"
+
+        uploaded = enhancer.client.files.uploaded
+        assert [line["key"] for line in uploaded] == ["prompt-0", "prompt-1"]
+        request = uploaded[1]["request"]
+        assert "a dog" in request["contents"][0]["parts"][0]["text"]
+        assert request["system_instruction"]["parts"][0]["text"] == wan_prompt_enhancer.SYSTEM_PROMPT
+        assert request["generation_config"]["max_output_tokens"] == enhancer.max_output_tokens
+        assert enhancer.client.batches.created == [
+            {"model": enhancer.quality_model, "src": "files/batch-input"}
+        ]
+
+    def test_poll_reads_inline_results(self, enhancer: PromptEnhancer) -> None:
+        dest = SimpleNamespace(
+            inlined_responses=[
+                SimpleNamespace(response=make_response("1. Golden hour"), error=None),
+                SimpleNamespace(response=None, error="quota exceeded"),
+            ],
+            file_name=None,
+        )
+        enhancer.client.batches.jobs = [
+            make_job("JOB_STATE_RUNNING"),
+            make_job("JOB_STATE_SUCCEEDED", dest),
+        ]
+
+        results = enhancer.poll_batch("batches/123", 2, poll_interval=0)
+
+        assert results[0] == ("1. Golden hour", True)
+        assert results[1][0].startswith("❌") and "quota exceeded" in results[1][0]
+
+    def test_poll_reads_results_file_of_partial_success(self, enhancer: PromptEnhancer) -> None:
+        lines = [
+            {"key": "prompt-1", "error": {"code": 500}},
+            {
+                "key": "prompt-0",
+                "response": {
+                    "candidates": [{"content": {"parts": [{"text": "1. Blue hour"}]}, "finishReason": "STOP"}]
+                },
+            },
+        ]
+        enhancer.client.files.downloads["files/out"] = "\n".join(map(json.dumps, lines)).encode()
+        dest = SimpleNamespace(inlined_responses=None, file_name="files/out")
+        enhancer.client.batches.jobs = [make_job("JOB_STATE_PARTIALLY_SUCCEEDED", dest)]
+
+        results = enhancer.poll_batch("batches/123", 3, poll_interval=0)
+
+        assert results[0] == ("1. Blue hour", True)
+        assert results[1][0].startswith("❌") and not results[1][1]
+        assert results[2] == ("❌ Error: No result returned for this prompt.", False)
+
+    def test_poll_raises_for_failed_job(self, enhancer: PromptEnhancer) -> None:
+        enhancer.client.batches.jobs = [make_job("JOB_STATE_FAILED")]
+
+        with pytest.raises(RuntimeError, match="JOB_STATE_FAILED"):
+            enhancer.poll_batch("batches/123", 1, poll_interval=0)
+
+    def test_job_reports_name_and_caches_only_complete_results(
+        self, enhancer: PromptEnhancer
+    ) -> None:
+        enhancer.client.models.responses.append(make_response("1. Cached"))
+        enhancer.enhance_prompt("already cached prompt here for the quality model")
+        dest = SimpleNamespace(
+            inlined_responses=[
+                SimpleNamespace(response=make_response("1. Golden hour"), error=None),
+                SimpleNamespace(response=make_response("1. Gold", "MAX_TOKENS"), error=None),
+            ],
+            file_name=None,
+        )
+        enhancer.client.batches.jobs = [make_job("JOB_STATE_SUCCEEDED", dest)]
+        submitted: List[str] = []
+
+        results = enhancer.enhance_batch_job(
+            ["already cached prompt here for the quality model", "a cat", "a dog"],
+            poll_interval=0,
+            on_submit=submitted.append,
+        )
+
+        assert submitted == ["batches/123"]
+        assert len(enhancer.client.files.uploaded) == 2
+        assert results[:2] == ["1. Cached", "1. Golden hour"]
+        model = enhancer.quality_model
+        assert enhancer.cache is not None
+        assert enhancer.cache.get(enhancer._cache_key(model, "a cat")) == "1. Golden hour"
+        assert enhancer.cache.get(enhancer._cache_key(model, "a dog")) is None
+
+
+class TestStreaming:
+    def test_chunks_are_echoed_and_cached(
+        self, enhancer: PromptEnhancer, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        enhancer.client.models.streams.append(
+            [make_chunk("1. Golden "), make_chunk("hour", "STOP")]
+        )
+
+        assert enhancer.enhance_prompt("a cat", stream=True) == "1. Golden hour"
+        assert capsys.readouterr().out == "1. Golden hour\n"
+
+        # The cache hit is printed as well, since streaming callers don't print
+        assert enhancer.enhance_prompt("a cat", stream=True) == "1. Golden hour"
+        assert capsys.readouterr().out == "1. Golden hour\n"
+        assert len(enhancer.client.models.calls) == 1
+
+    def test_interrupted_stream_is_flagged_and_not_cached(
+        self, enhancer: PromptEnhancer, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        enhancer.client.models.streams.append(
+            [make_chunk("1. Golden "), ConnectionError("connection reset")]
+        )
+
+        result = enhancer.enhance_prompt("a cat", stream=True)
+
+        out = capsys.readouterr().out
+        assert out.startswith("1. Golden \n⚠️  Stream interrupted")
+        assert "connection reset" in out and result.startswith("❌")
+        # Nothing was retried behind the user's back, and nothing was cached
+        assert len(enhancer.client.models.calls) == 1
+        assert enhancer.cache is not None
+        assert enhancer.cache.get(enhancer._cache_key(enhancer.select_model("a cat"), "a cat")) is None
+
+
+class TestEnhanceParallel:
+    @staticmethod
+    def reply_by_directive(replies: Dict[str, Any]) -> Callable[[str], Any]:
+        """Answer each variation request based on the style directive it carries."""
+
+        def reply(contents: str) -> Any:
+            return next(value for directive, value in replies.items() if directive in contents)
+
+        return reply
+
+    def test_variations_are_renumbered_and_cached(self, enhancer: PromptEnhancer) -> None:
+        directives = wan_prompt_enhancer.STYLE_DIRECTIVES[:2]
+        enhancer.client.models.reply = self.reply_by_directive(
+            {directives[0]: make_response("1. Golden hour"), directives[1]: make_response("Blue hour")}
+        )
+
+        result = enhancer.run(enhancer.enhance_prompt_parallel("a cat", n=2))
+
+        assert result == "1. Golden hour\n\n2. Blue hour"
+        assert enhancer.run(enhancer.enhance_prompt_parallel("a cat", n=2)) == result
+        assert len(enhancer.client.models.calls) == 2
+
+    def test_partial_failure_is_reported_and_not_cached(self, enhancer: PromptEnhancer) -> None:
+        directives = wan_prompt_enhancer.STYLE_DIRECTIVES[:3]
+        enhancer.client.models.reply = self.reply_by_directive({
+            directives[0]: make_response("Golden hour"),
+            directives[1]: RuntimeError("quota exceeded"),
+            directives[2]: make_response(""),
+        })
+
+        result = enhancer.run(enhancer.enhance_prompt_parallel("a cat", n=3))
+
+        assert result.startswith("1. Golden hour\n\n")
+        assert result.endswith("⚠️  2 of 3 variations failed: quota exceeded")
+        enhancer.run(enhancer.enhance_prompt_parallel("a cat", n=3))
+        assert len(enhancer.client.models.calls) == 6
+
+    def test_truncated_variation_is_not_cached(self, enhancer: PromptEnhancer) -> None:
+        directives = wan_prompt_enhancer.STYLE_DIRECTIVES[:2]
+        enhancer.client.models.reply = self.reply_by_directive({
+            directives[0]: make_response("Golden hour"),
+            directives[1]: make_response("Blue ho", "MAX_TOKENS"),
+        })
+
+        enhancer.run(enhancer.enhance_prompt_parallel("a cat", n=2))
+        enhancer.run(enhancer.enhance_prompt_parallel("a cat", n=2))
+
+        assert len(enhancer.client.models.calls) == 4
+
+    def test_all_failures_return_the_error(self, enhancer: PromptEnhancer) -> None:
+        enhancer.client.models.reply = lambda contents: RuntimeError("quota exceeded")
+
+        result = enhancer.run(enhancer.enhance_prompt_parallel("a cat", n=2))
+
+        assert result.startswith("❌") and "quota exceeded" in result
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["a cat", "--parallel", "3", "--stream"],
+        ["--parallel", "3", "--batch", "prompts.txt"],
+        ["--parallel", "3", "--batch-file", "prompts.txt"],
+    ],
+)
+def test_parallel_rejects_conflicting_modes(
+    argv: List[str], monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    monkeypatch.setattr("sys.argv", ["wan-enhancer", *argv])
+
+    with pytest.raises(SystemExit) as excinfo:
+        wan_prompt_enhancer.main()
+
+    assert excinfo.value.code == 2
+    assert "can't be combined" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ("- a cat on a roof", "a cat on a roof"),
+        ("* a cat on a roof", "a cat on a roof"),
+        ("• a cat on a roof", "a cat on a roof"),
+        ("2. a cat on a roof", "a cat on a roof"),
+        ("3) a cat on a roof", "a cat on a roof"),
+        ("1920s jazz club", "1920s jazz club"),
+        ("3 cats on a roof", "3 cats on a roof"),
+    ],
+)
+def test_list_marker_stripping(line: str, expected: str) -> None:
+    assert wan_prompt_enhancer._LIST_MARKER.sub("", line, count=1) == expected
+
+
+class TestPrefetch:
+    def test_suggestions_are_enhanced_into_the_cache(
+        self, semantic_enhancer: PromptEnhancer
+    ) -> None:
+        enhancer = semantic_enhancer
+        models = enhancer.client.models
+        models.reply = lambda contents: make_response(
+            "1. a kitten\n- a puppy\n" if contents.startswith("Suggest") else "1. Golden hour"
+        )
+
+        enhancer.prefetch("a cat", count=2)
+        assert enhancer._prefetch_thread is not None
+        enhancer._prefetch_thread.join(5)
+
+        assert models.calls[0] == enhancer.prefetch_model
+        assert enhancer.cache is not None
+        for suggestion in ("a kitten", "a puppy"):
+            key = enhancer._cache_key(enhancer.select_model(suggestion), suggestion)
+            assert enhancer.cache.get(key) == "1. Golden hour"
+
+    def test_does_nothing_without_semantic_cache(self, enhancer: PromptEnhancer) -> None:
+        enhancer.prefetch("a cat")
+
+        assert enhancer._prefetch_thread is None
+        assert enhancer.client.models.calls == []
+
+    def test_stop_discards_response_in_flight(self, semantic_enhancer: PromptEnhancer) -> None:
+        enhancer = semantic_enhancer
+        generating = threading.Event()
+        release = threading.Event()
+
+        def reply(contents: str) -> SimpleNamespace:
+            if contents.startswith("Suggest"):
+                return make_response("a kitten\na puppy")
+            generating.set()
+            release.wait(5)
+            return make_response("1. Golden hour")
+
+        enhancer.client.models.reply = reply
+        enhancer.prefetch("a cat", count=2)
+        assert generating.wait(5)
+
+        enhancer.stop_prefetch(timeout=0.01)
+        release.set()
+        assert enhancer._prefetch_thread is not None
+        enhancer._prefetch_thread.join(5)
+
+        # Only the in-flight suggestion was generated, and it was never stored
+        assert len(enhancer.client.models.calls) == 2
+        assert enhancer.cache is not None
+        key = enhancer._cache_key(enhancer.select_model("a kitten"), "a kitten")
+        assert enhancer.cache.get(key) is None
+
+
+class TestSelectModel:
+    def test_short_prompt_uses_fast_model(self, enhancer: PromptEnhancer) -> None:
+        assert enhancer.select_model("a cat") == "gemini-2.5-flash-lite"
+
+    def test_long_prompt_uses_quality_model(self, enhancer: PromptEnhancer) -> None:
+        prompt = "a cat playing a grand piano on a rainy rooftop at night"
+        assert enhancer.select_model(prompt) == "gemini-2.5-flash"
+
+    def test_routing_disabled(self, tmp_path: Any, clean_env: pytest.MonkeyPatch) -> None:
+        enhancer = PromptEnhancer(
+            api_key="test-key", model="gemini-2.5-pro", cache_dir=str(tmp_path), route=False
+        )
+        assert enhancer.select_model("a cat") == "gemini-2.5-pro"
+
+    def test_empty_fast_model_disables_routing(
+        self, tmp_path: Any, clean_env: pytest.MonkeyPatch
+    ) -> None:
+        clean_env.setenv("GEMINI_FAST_MODEL", "")
+        enhancer = PromptEnhancer(api_key="test-key", cache_dir=str(tmp_path))
+        assert enhancer.select_model("a cat") == "gemini-2.5-flash"
+
+
+@pytest.mark.parametrize(
+    "flags, model, route",
+    [
+        ([], None, True),
+        (["--model", "gemini-2.5-pro"], "gemini-2.5-pro", False),
+        (["--force-model", "gemini-2.5-pro"], "gemini-2.5-pro", False),
+    ],
+)
+def test_model_flag_turns_routing_off(
+    flags: List[str], model: Optional[str], route: bool, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    created: Dict[str, Any] = {}
+
+    def fake_enhancer(**kwargs: Any) -> None:
+        created.update(kwargs)
+        raise SystemExit(0)
+
+    monkeypatch.setattr(wan_prompt_enhancer, "PromptEnhancer", fake_enhancer)
+    monkeypatch.setattr("sys.argv", ["wan-enhancer", "a cat", *flags])
+
+    with pytest.raises(SystemExit):
+        wan_prompt_enhancer.main()
+
+    assert (created["model"], created["route"]) == (model, route)
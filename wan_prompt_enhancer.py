@@ -2,7 +2,9 @@
 # /// script
 # requires-python = ">=3.9"
 # dependencies = [
-#     "google-genai>=0.8.0",
+#     "google-genai>=1.47.0",
+#     "httpx>=0.27.0",
+#     "numpy>=1.21.0",
 #     "python-dotenv>=1.0.0"
 # ]
 # ///
@@ -24,20 +26,33 @@ Author: Jeremy Schroeder
 License: AGPL-3.0
 """
 
+from __future__ import annotations
+
 import argparse
+import asyncio
+import hashlib
+import json
 import os
+import re
+import shelve
 import sys
-from typing import Optional
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
 
-from dotenv import load_dotenv
-from google import genai
-from google.genai import types
+if TYPE_CHECKING:
+    import numpy as np
 
-# Load environment variables from .env file
-load_dotenv()
+# Heavy dependencies are imported on first use, so --help and --version stay fast.
+# The .env file is loaded at the same point, once per process.
+_dotenv_loaded: bool = False
 
 # System prompt for Gemini based on WAN 2.2 guide
-# This comprehensive prompt teaches the AI to follow WAN 2.2's Advanced Formula
+# This comprehensive prompt teaches the AI to follow WAN 2.2's Advanced Formula.
+# How many variations to produce is left to the user templates below, since
+# enhance_prompt_parallel asks for exactly one per request
 SYSTEM_PROMPT: str = """You are an expert cinematographer and prompt engineer specializing in WAN 2.2 video generation. Your job is to transform basic user inputs into professional, cinematic prompts that follow the WAN 2.2 aesthetic control system.
 
 **Core Guidelines:**
@@ -65,7 +80,281 @@ SYSTEM_PROMPT: str = """You are an expert cinematographer and prompt engineer sp
 Input: "a felt gnome village in the woods"
 Output: "Felt style, golden hour sunlight, soft lighting, medium wide-angle, low-angle perspective, warm color palette. A whimsical village is nestled at the base of a giant, hollow tree trunk, surrounded by lush greenery and mushrooms. Little felt gnomes in woolen hats drive a miniature wooden train on moss-covered tracks. The train, pulled by tiny engine, transports acorns and berries in small carts. Sunlight filters through the leaves above, casting soft shadows and highlighting the rich textures of the bark and foliage."
 
-Generate 3-5 enhanced prompt variations for each user input, each with different cinematic approaches but maintaining the core concept. Use diverse lighting, camera angles, and stylistic choices across variations. Format output as clean text without bold, italics, or other markdown formatting."""
+Format output as clean text without bold, italics, or other markdown formatting."""
+
+# User message template, built once rather than re-assembled on every request
+_USER_TEMPLATE: str = """Transform this basic prompt into 3-5 professional WAN 2.2 video generation prompts with different cinematic approaches:
+
+"{prompt}"
+
+Each variation should have different:
+- Lighting setups (sunny, overcast, artificial, etc.)
+- Camera angles and shot sizes
+- Color palettes and moods  
+- Stylistic approaches
+- Motion descriptions
+
+Number each variation (1-5) and ensure they're all visually distinct while maintaining the core concept. Use diverse lighting, camera angles, and stylistic choices across variations."""
+
+# Distinct looks requested from each call in enhance_prompt_parallel
+STYLE_DIRECTIVES: List[str] = [
+    "epic golden-hour",
+    "dark stormy",
+    "whimsical felt",
+    "neon cyberpunk",
+    "documentary realism",
+]
+
+# User message template asking for a single variation in a given style
+_VARIATION_TEMPLATE: str = """Transform this basic prompt into exactly one professional WAN 2.2 video generation prompt with a {directive} cinematic approach:
+
+"{prompt}"
+
+Choose lighting, camera angle, shot size, color palette and motion that suit the {directive} style while maintaining the core concept. Return only the prompt text, without a number or title."""
+
+# Asks a cheap model for prompts the user is likely to try next in a session
+_PREFETCH_TEMPLATE: str = """Suggest {count} short video prompt ideas that someone who just wrote "{prompt}" is likely to try next, such as rephrasings or small changes to the subject, setting or action. Reply with one idea per line and nothing else."""
+
+# Leading bullet or number on a suggestion line, e.g. "- ", "2. " or "3) "
+_LIST_MARKER = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+# Appended to responses that stopped before Gemini finished them
+_TRUNCATED_NOTICE = "⚠️  Response was cut off (raise WAN_MAX_TOKENS for longer output)"
+
+# Fingerprint of the prompt templates, so cached responses are invalidated whenever
+# the prompt engineering instructions change
+_PROMPT_HASH: str = hashlib.blake2b(
+    (SYSTEM_PROMPT + _USER_TEMPLATE + _VARIATION_TEMPLATE + "".join(STYLE_DIRECTIVES)).encode(),
+    digest_size=16
+).hexdigest()
+
+# System instruction in the REST shape used by batch request files
+_BATCH_SYSTEM_INSTRUCTION: Dict[str, Any] = {"parts": [{"text": SYSTEM_PROMPT}]}
+
+CacheKey = Tuple[object, ...]
+
+T = TypeVar("T")
+
+# Response text and whether generation finished normally (not cut off by the
+# token cap, safety filters, etc.); only complete responses are cached
+Generation = Tuple[str, bool]
+
+# Prompts with fewer words than this are routed to the fast model
+_FAST_MODEL_MAX_WORDS: int = 8
+
+# Maximum number of texts sent in one embedding request
+_EMBED_BATCH_SIZE: int = 100
+
+# Inputs that end an interactive session
+_EXIT_WORDS = frozenset({"quit", "exit", "q", "stop"})
+
+# Batch job states after which polling stops
+_BATCH_DONE_STATES = frozenset({
+    "JOB_STATE_SUCCEEDED",
+    "JOB_STATE_PARTIALLY_SUCCEEDED",
+    "JOB_STATE_FAILED",
+    "JOB_STATE_CANCELLED",
+    "JOB_STATE_EXPIRED",
+})
+
+# Terminal batch job states that still carry per-request results
+_BATCH_RESULT_STATES = frozenset({"JOB_STATE_SUCCEEDED", "JOB_STATE_PARTIALLY_SUCCEEDED"})
+
+class ResponseCache:
+    """Two-tier exact-match cache for enhanced prompts.
+    
+    Keeps the most recently used responses in memory and persists every response
+    to a ``shelve`` database on disk, so repeated prompts return instantly both
+    within a session and across CLI invocations. Disk errors are never fatal; the
+    cache simply behaves as a miss.
+    
+    Attributes:
+        cache_dir: Directory holding the on-disk cache database
+        maxsize: Maximum number of responses kept in the in-memory tier
+    """
+    
+    def __init__(self, cache_dir: str, maxsize: int = 256) -> None:
+        """Initialize the cache.
+        
+        Args:
+            cache_dir: Directory for the on-disk tier. Created on first write.
+            maxsize: Maximum number of entries held in memory.
+        """
+        self.cache_dir = cache_dir
+        self.maxsize = maxsize
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+    @staticmethod
+    def digest(key: CacheKey) -> str:
+        """Return the stable hex digest used to store a cache key."""
+        return hashlib.blake2b(repr(key).encode()).hexdigest()
+        
+    @property
+    def _db_path(self) -> str:
+        return os.path.join(self.cache_dir, "responses")
+        
+    def get(self, key: CacheKey) -> Optional[str]:
+        """Look up a cached response, checking memory first and then disk.
+        
+        Args:
+            key: Cache key tuple describing the request
+            
+        Returns:
+            The cached response text, or None on a cache miss.
+        """
+        digest = self.digest(key)
+        with self._lock:
+            if digest in self._memory:
+                self._memory.move_to_end(digest)
+                return self._memory[digest]
+                
+            try:
+                with shelve.open(self._db_path, flag="r") as db:
+                    value = db.get(digest)
+            except Exception:
+                # Missing or unreadable database: treat as a miss
+                return None
+                
+            if value is not None:
+                self._remember(digest, value)
+            return value
+            
+    def set(self, key: CacheKey, value: str) -> None:
+        """Store a response in both the memory and disk tiers.
+        
+        Args:
+            key: Cache key tuple describing the request
+            value: Response text to cache
+        """
+        digest = self.digest(key)
+        with self._lock:
+            self._remember(digest, value)
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with shelve.open(self._db_path) as db:
+                    db[digest] = value
+            except Exception:
+                # The disk tier is best-effort; the memory tier still applies
+                pass
+                
+    def _remember(self, digest: str, value: str) -> None:
+        self._memory[digest] = value
+        self._memory.move_to_end(digest)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+class SemanticCache:
+    """Similarity-based cache that reuses responses for near-duplicate prompts.
+    
+    Stores an L2-normalized embedding matrix per cache namespace (model, thinking
+    budget and system prompt) alongside a parallel list of responses. A lookup is a
+    single matrix-vector product, which stays fast for thousands of entries without
+    requiring a vector database. Both are persisted together in the cache directory
+    as ``<namespace>.npz``, which is replaced atomically on every write.
+    
+    Attributes:
+        cache_dir: Directory holding the persisted embeddings and responses
+        threshold: Minimum cosine similarity for a cached response to be reused
+    """
+    
+    def __init__(self, cache_dir: str, threshold: float) -> None:
+        """Initialize the semantic cache.
+        
+        Args:
+            cache_dir: Directory for the persisted embeddings. Created on first write.
+            threshold: Cosine similarity (0-1) required for a cache hit.
+        """
+        import numpy as np
+        
+        self._np = np
+        self.cache_dir = cache_dir
+        self.threshold = threshold
+        self._entries: Dict[str, Tuple[np.ndarray, List[str]]] = {}
+        self._lock = threading.Lock()
+        
+    def lookup(self, namespace: CacheKey, vector: Sequence[float]) -> Optional[str]:
+        """Return the cached response most similar to an embedding, if close enough.
+        
+        Args:
+            namespace: Cache namespace tuple the response must belong to
+            vector: Embedding of the incoming prompt
+            
+        Returns:
+            The best matching response, or None if nothing meets the threshold.
+        """
+        query = self._normalize(vector)
+        with self._lock:
+            matrix, responses = self._load(ResponseCache.digest(namespace))
+            if not responses or matrix.shape[1] != query.shape[0]:
+                return None
+                
+            sims = matrix @ query
+            best = int(self._np.argmax(sims))
+            if sims[best] >= self.threshold:
+                return responses[best]
+            return None
+            
+    def add(self, namespace: CacheKey, vector: Sequence[float], response: str) -> None:
+        """Append an embedding and its response to the cache.
+        
+        Args:
+            namespace: Cache namespace tuple the response belongs to
+            vector: Embedding of the prompt that produced the response
+            response: Response text to cache
+        """
+        query = self._normalize(vector)
+        digest = ResponseCache.digest(namespace)
+        with self._lock:
+            matrix, responses = self._load(digest)
+            if responses and matrix.shape[1] != query.shape[0]:
+                # Embedding model changed dimensions; start a fresh matrix
+                matrix, responses = self._np.empty((0, query.shape[0]), dtype=self._np.float32), []
+                
+            matrix = self._np.vstack([matrix.reshape(-1, query.shape[0]), query])
+            responses = responses + [response]
+            self._entries[digest] = (matrix, responses)
+            
+            self._save(digest, matrix, responses)
+                
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, f"{digest}.npz")
+        
+    def _save(self, digest: str, matrix: np.ndarray, responses: List[str]) -> None:
+        tmp_path = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write a sibling temp file and rename it over the old one, so an
+            # interrupted write can never leave a half-written or mismatched file
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                self._np.savez(f, matrix=matrix, responses=self._np.array(responses, dtype=str))
+            os.replace(tmp_path, self._path(digest))
+        except Exception:
+            # Persistence is best-effort; the in-memory entries still apply
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                
+    def _load(self, digest: str) -> Tuple[np.ndarray, List[str]]:
+        if digest not in self._entries:
+            try:
+                with self._np.load(self._path(digest)) as data:
+                    matrix = data["matrix"]
+                    responses = [str(response) for response in data["responses"]]
+                if len(responses) != matrix.shape[0]:
+                    raise ValueError("semantic cache file is inconsistent")
+            except Exception:
+                matrix, responses = self._np.empty((0, 0), dtype=self._np.float32), []
+            self._entries[digest] = (matrix, responses)
+        return self._entries[digest]
+        
+    def _normalize(self, vector: Sequence[float]) -> np.ndarray:
+        array = self._np.asarray(vector, dtype=self._np.float32)
+        norm = float(self._np.linalg.norm(array))
+        return array / norm if norm else array
 
 class PromptEnhancer:
     """Main class for enhancing basic prompts into WAN 2.2 cinematic video prompts.
@@ -75,6 +364,8 @@ class PromptEnhancer:
     
     Attributes:
         client: Google Gemini AI client instance
+        cache: Response cache, or None when caching is disabled
+        semantic_cache: Similarity cache, or None unless WAN_CACHE_SIM is set
     
     Example:
         >>> enhancer = PromptEnhancer(api_key="your_key_here")
@@ -82,7 +373,14 @@ class PromptEnhancer:
         >>> print(enhanced)
     """
     
-    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        use_cache: bool = True,
+        cache_dir: Optional[str] = None,
+        route: bool = True,
+    ) -> None:
         """Initialize the prompt enhancer with Gemini client.
         
         Args:
@@ -90,11 +388,24 @@ class PromptEnhancer:
                     environment variable.
             model: Optional model name. If not provided, will use GEMINI_MODEL environment
                   variable or default to 'gemini-2.5-flash'.
+            use_cache: Whether to reuse responses for previously enhanced prompts.
+            cache_dir: Optional cache directory. If not provided, will use WAN_CACHE_DIR
+                      environment variable or default to '.wan_cache'.
+            route: Whether to send short prompts to the cheaper GEMINI_FAST_MODEL
+                  (default 'gemini-2.5-flash-lite'). If False, every prompt uses model.
                     
         Raises:
             SystemExit: If API key is not found or client initialization fails.
         """
+        global _dotenv_loaded
         try:
+            from dotenv import load_dotenv
+            
+            # Load environment variables from .env file
+            if not _dotenv_loaded:
+                load_dotenv()
+                _dotenv_loaded = True
+                
             # Use provided API key or fall back to environment variable
             effective_api_key = api_key or os.getenv("GEMINI_API_KEY")
             
@@ -106,17 +417,222 @@ class PromptEnhancer:
                 sys.exit(1)
                 
             # Configure model (with fallback to environment variable or default)
-            self.model = model or os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+            self.model: str = model or os.getenv("GEMINI_MODEL") or "gemini-2.5-flash"
+            self.quality_model = self.model
+            # An empty GEMINI_FAST_MODEL turns routing off as well
+            self.fast_model: Optional[str] = None
+            if route:
+                self.fast_model = os.getenv("GEMINI_FAST_MODEL", "gemini-2.5-flash-lite") or None
             self.thinking_budget = int(os.getenv("GEMINI_THINKING_BUDGET", "0"))
+            # On thinking models the thinking budget is drawn from the same output
+            # allowance, so it is added on top of the visible-text cap
+            self.max_output_tokens = int(os.getenv("WAN_MAX_TOKENS", "1200")) + max(self.thinking_budget, 0)
+            self.temperature = float(os.getenv("WAN_TEMP", "0.9"))
+                
+            import httpx
+            from google import genai
+            from google.genai import types
+            
+            self._types = types
+            
+            # Keep a warm pool of keep-alive connections so consecutive and
+            # concurrent requests skip the TCP and TLS handshakes
+            limits = httpx.Limits(max_keepalive_connections=32, max_connections=64, keepalive_expiry=60)
+            self.client = genai.Client(
+                api_key=effective_api_key,
+                # Explicit httpx clients also keep the SDK from switching its async
+                # transport to aiohttp, which would ignore these limits
+                http_options=self._types.HttpOptions(
+                    httpx_client=httpx.Client(limits=limits),
+                    httpx_async_client=httpx.AsyncClient(limits=limits)
+                )
+            )
+            
+            # Shared by every request, so it is only built once
+            self._gen_config = types.GenerateContentConfig(
+                system_instruction=SYSTEM_PROMPT,
+                thinking_config=types.ThinkingConfig(thinking_budget=self.thinking_budget),
+                max_output_tokens=self.max_output_tokens,
+                temperature=self.temperature,
+                candidate_count=1
+            )
+            
+            self.cache: Optional[ResponseCache] = None
+            self.semantic_cache: Optional[SemanticCache] = None
+            if use_cache:
+                effective_cache_dir = cache_dir or os.getenv("WAN_CACHE_DIR") or ".wan_cache"
+                self.cache = ResponseCache(effective_cache_dir)
                 
-            self.client = genai.Client(api_key=effective_api_key)
+                # Near-duplicate matching is opt-in since it costs an embedding call
+                similarity = os.getenv("WAN_CACHE_SIM")
+                if similarity:
+                    self.embed_model = os.getenv("GEMINI_EMBED_MODEL", "gemini-embedding-001")
+                    self.semantic_cache = SemanticCache(effective_cache_dir, float(similarity))
+                    
+            self._loop: Optional[asyncio.AbstractEventLoop] = None
+            
+            self.prefetch_model = os.getenv("GEMINI_PREFETCH_MODEL", "gemini-2.5-flash-lite")
+            self._prefetch_thread: Optional[threading.Thread] = None
+            self._prefetch_stop = threading.Event()
             
         except Exception as e:
             print(f"❌ Error initializing Gemini client: {e}")
             print("Please check your API key and internet connection.")
             sys.exit(1)
 
-    def enhance_prompt(self, basic_prompt: str) -> str:
+    def warmup(self) -> None:
+        """Open a connection to the API ahead of the first real request.
+        
+        Runs a lightweight model metadata lookup in a background thread, so the
+        TLS handshake happens while the user is still typing. Failures are
+        ignored; the first request simply pays the connection cost instead.
+        """
+        def prime() -> None:
+            try:
+                self.client.models.get(model=self.model)
+            except Exception:
+                pass
+                
+        threading.Thread(target=prime, daemon=True).start()
+
+    def prefetch(self, last_prompt: str, count: int = 3) -> None:
+        """Speculatively enhance prompts related to the last one in the background.
+        
+        A cheap model suggests likely follow-up prompts, which are enhanced and
+        stored in the caches while the user is still typing, making the next turn
+        more likely to be a semantic cache hit. Does nothing unless the semantic
+        cache is enabled, and skips the round if a previous prefetch is still
+        running. Costs extra tokens for every suggestion that isn't already cached.
+        Call stop_prefetch before exiting so no cache write is cut short.
+        
+        Args:
+            last_prompt: The prompt that was just enhanced
+            count: Number of related prompts to prefetch
+        """
+        if self.semantic_cache is None or not last_prompt.strip():
+            return
+        if self._prefetch_thread is not None and self._prefetch_thread.is_alive():
+            return
+            
+        stop = self._prefetch_stop = threading.Event()
+        
+        def work() -> None:
+            try:
+                response = self.client.models.generate_content(
+                    model=self.prefetch_model,
+                    contents=_PREFETCH_TEMPLATE.format(count=count, prompt=last_prompt.strip()),
+                    config=self._types.GenerateContentConfig(
+                        thinking_config=self._types.ThinkingConfig(thinking_budget=0),
+                        max_output_tokens=200,
+                        temperature=1.0
+                    )
+                )
+                suggestions = [
+                    _LIST_MARKER.sub("", line).strip().strip('"')
+                    for line in (response.text or "").splitlines()
+                ]
+                for suggestion in [s for s in suggestions if s][:count]:
+                    if stop.is_set():
+                        return
+                    model = self.select_model(suggestion)
+                    # Cache hits return without an API call, so covered ideas are free
+                    cached, embedding = self._lookup_cached(model, suggestion)
+                    if cached is not None:
+                        continue
+                    text, complete = self._generate(model, self._user_request(suggestion))
+                    # Checked again right before writing, since generation is slow
+                    if complete and not stop.is_set():
+                        self._store_cached(model, suggestion, embedding, text)
+            except Exception:
+                # Prefetching is purely an optimization
+                pass
+                
+        self._prefetch_thread = threading.Thread(target=work, daemon=True)
+        self._prefetch_thread.start()
+
+    def stop_prefetch(self, timeout: float = 5.0) -> None:
+        """Stop background prefetching and wait for a cache write in progress.
+        
+        The running round skips its remaining suggestions and discards any
+        response still being generated, so waiting only covers a write that
+        has already started.
+        
+        Args:
+            timeout: Maximum seconds to wait for the prefetch thread
+        """
+        self._prefetch_stop.set()
+        if self._prefetch_thread is not None:
+            self._prefetch_thread.join(timeout)
+
+    def run(self, coro: Awaitable[T]) -> T:
+        """Run a coroutine to completion on this enhancer's event loop.
+        
+        The loop is created on first use and kept for the enhancer's lifetime, so
+        the async client's pooled connections survive across calls (e.g. one
+        parallel enhancement per interactive prompt) instead of being tied to a
+        loop that asyncio.run would close.
+        """
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coro)
+
+    def select_model(self, basic_prompt: str) -> str:
+        """Pick the model for a prompt based on its length.
+        
+        Short prompts leave little to interpret, so the fast model rewrites them in
+        a fraction of the time and cost with negligible quality loss; longer
+        prompts go to the quality model.
+        
+        Args:
+            basic_prompt: The basic prompt to enhance
+            
+        Returns:
+            The model name to send the request to.
+        """
+        if self.fast_model and len(basic_prompt.split()) < _FAST_MODEL_MAX_WORDS:
+            return self.fast_model
+        return self.quality_model
+
+    def _cache_namespace(self, model: str, variant: str = "") -> CacheKey:
+        """Return the model settings that a cached response is only valid for."""
+        namespace: CacheKey = (
+            model, self.thinking_budget, self.max_output_tokens, self.temperature, _PROMPT_HASH
+        )
+        return namespace + (variant,) if variant else namespace
+
+    def _cache_key(self, model: str, basic_prompt: str, variant: str = "") -> CacheKey:
+        """Build the cache key for a prompt under the given model settings."""
+        return self._cache_namespace(model, variant) + (basic_prompt.strip().lower(),)
+
+    def _embed(self, text: str) -> Optional[List[float]]:
+        """Embed a prompt for the semantic cache, returning None on failure."""
+        return self._embed_many([text])[0]
+
+    def _embed_many(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Embed prompts in as few requests as possible.
+        
+        Returns:
+            One embedding per text, with None for any that couldn't be embedded.
+        """
+        embeddings: List[Optional[List[float]]] = []
+        for start in range(0, len(texts), _EMBED_BATCH_SIZE):
+            chunk = list(texts[start:start + _EMBED_BATCH_SIZE])
+            try:
+                result = self.client.models.embed_content(
+                    model=self.embed_model,
+                    contents=chunk,
+                    config=self._types.EmbedContentConfig(output_dimensionality=768)
+                )
+                values = [e.values for e in result.embeddings or []]
+            except Exception:
+                # A failed embedding only costs us the semantic lookup
+                values = []
+            if len(values) != len(chunk):
+                values = [None] * len(chunk)
+            embeddings.extend(values)
+        return embeddings
+
+    def enhance_prompt(self, basic_prompt: str, stream: bool = False) -> str:
         """Transform a basic prompt into 3-5 enhanced WAN 2.2 style prompts.
         
         Takes a simple user prompt and generates multiple professional video generation
@@ -125,54 +641,448 @@ class PromptEnhancer:
         
         Args:
             basic_prompt: The basic prompt to enhance (e.g., "a cat playing piano")
+            stream: If True, write the result to stdout as it is generated so the
+                   first variation appears as soon as Gemini starts responding.
+                   Cache hits and errors are written too, so callers should not
+                   print the returned text again.
             
         Returns:
             A formatted string containing 3-5 enhanced prompt variations, each with
             different lighting, camera angles, color palettes, and stylistic approaches.
+            A response that was cut off ends with a notice and is not cached.
             
         Example:
             >>> enhancer.enhance_prompt("a dragon flying")
             '1. **Epic Fantasy Style**, golden hour lighting, wide-angle shot...
              2. **Dark Cinematic Style**, stormy lighting, close-up shot...'
         """
+        if not basic_prompt or not basic_prompt.strip():
+            return self._emit("❌ Error: Please provide a valid prompt to enhance.", stream)
+            
+        model = self.select_model(basic_prompt)
+        cached, embedding = self._lookup_cached(model, basic_prompt)
+        if cached is not None:
+            return self._emit(cached, stream)
+            
+        try:
+            text, complete = self._generate(model, self._user_request(basic_prompt), stream=stream)
+            if not complete:
+                # The streamed text is already on screen, so only the notice is added
+                self._emit(_TRUNCATED_NOTICE, stream)
+                return f"{text}\n\n{_TRUNCATED_NOTICE}"
+            self._store_cached(model, basic_prompt, embedding, text)
+            return text
+            
+        except Exception as e:
+            return self._emit(
+                f"❌ Error generating enhanced prompts: {e}\nPlease check your API key and internet connection.",
+                stream
+            )
+
+    async def enhance_prompt_async(self, basic_prompt: str) -> str:
+        """Async variant of enhance_prompt using Gemini's native async client.
+        
+        Lets several prompts be in flight at once, e.g. via enhance_batch. Cache
+        lookups and other blocking calls run in a worker thread so they never
+        stall the event loop.
+        
+        Args:
+            basic_prompt: The basic prompt to enhance (e.g., "a cat playing piano")
+            
+        Returns:
+            A formatted string containing 3-5 enhanced prompt variations, or an
+            error message if generation failed.
+        """
+        if not basic_prompt or not basic_prompt.strip():
+            return "❌ Error: Please provide a valid prompt to enhance."
+            
+        model = self.select_model(basic_prompt)
+        cached, embedding = await asyncio.to_thread(self._lookup_cached, model, basic_prompt)
+        if cached is not None:
+            return cached
+            
+        try:
+            text, complete = await self._generate_async(model, self._user_request(basic_prompt))
+            if not complete:
+                return f"{text}\n\n{_TRUNCATED_NOTICE}"
+            await asyncio.to_thread(self._store_cached, model, basic_prompt, embedding, text)
+            return text
+            
+        except Exception as e:
+            return f"❌ Error generating enhanced prompts: {e}\nPlease check your API key and internet connection."
+
+    async def enhance_batch(self, prompts: Sequence[str], concurrency: int = 8) -> List[str]:
+        """Enhance many prompts concurrently.
+        
+        Args:
+            prompts: Basic prompts to enhance
+            concurrency: Maximum number of requests in flight at once, to stay
+                        within API rate limits
+            
+        Returns:
+            Enhanced results in the same order as the input prompts.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def bounded(prompt: str) -> str:
+            async with semaphore:
+                return await self.enhance_prompt_async(prompt)
+                
+        return list(await asyncio.gather(*(bounded(prompt) for prompt in prompts)))
+
+    async def enhance_prompt_parallel(self, basic_prompt: str, n: int = 4) -> str:
+        """Generate variations as independent concurrent requests.
+        
+        Instead of one long response containing every variation, each of the first
+        n STYLE_DIRECTIVES is requested separately and all requests run at once,
+        so wall time is roughly that of a single variation. This costs n times the
+        input tokens of enhance_prompt.
+        
+        Args:
+            basic_prompt: The basic prompt to enhance (e.g., "a cat playing piano")
+            n: Number of variations, between 1 and len(STYLE_DIRECTIVES)
+            
+        Returns:
+            The numbered variations, followed by a warning when some requests
+            failed, or an error message if every request failed.
+        """
         if not basic_prompt or not basic_prompt.strip():
             return "❌ Error: Please provide a valid prompt to enhance."
             
+        n = min(max(1, n), len(STYLE_DIRECTIVES))
+        variant = f"parallel-{n}"
+        model = self.select_model(basic_prompt)
+        cached, embedding = await asyncio.to_thread(self._lookup_cached, model, basic_prompt, variant)
+        if cached is not None:
+            return cached
+            
+        directives = STYLE_DIRECTIVES[:n]
+        results = await asyncio.gather(
+            *(
+                self._generate_async(
+                    model,
+                    _VARIATION_TEMPLATE.format(prompt=basic_prompt.strip(), directive=directive)
+                )
+                for directive in directives
+            ),
+            return_exceptions=True
+        )
+        
+        generations = [r for r in results if isinstance(r, tuple)]
+        # Drop any numbering the model added anyway, since the variations are renumbered
+        variations = [_LIST_MARKER.sub("", text.strip(), count=1) for text, _ in generations if text and text.strip()]
+        error = next((r for r in results if isinstance(r, BaseException)), "empty response")
+        if not variations:
+            return f"❌ Error generating enhanced prompts: {error}\nPlease check your API key and internet connection."
+            
+        text = "\n\n".join(f"{i}. {variation}" for i, variation in enumerate(variations, 1))
+        failed = len(directives) - len(variations)
+        if failed:
+            return f"{text}\n\n⚠️  {failed} of {len(directives)} variations failed: {error}"
+        if all(complete for _, complete in generations):
+            # Only complete results are cached, so a retry can fill in the gaps
+            await asyncio.to_thread(self._store_cached, model, basic_prompt, embedding, text, variant)
+        return text
+
+    def enhance_batch_job(
+        self,
+        prompts: Sequence[str],
+        poll_interval: float = 30.0,
+        on_submit: Optional[Callable[[str], None]] = None,
+    ) -> List[str]:
+        """Enhance many prompts through the discounted Gemini Batch API.
+        
+        Prompts already in the cache are answered locally; the rest are submitted
+        as a single batch job, which is polled until it finishes. Batch jobs can
+        take minutes to hours, so this suits bulk, non-interactive workloads. A
+        job targets one model, so every prompt uses the quality model.
+        
+        Args:
+            prompts: Basic prompts to enhance
+            poll_interval: Seconds to wait between job status checks
+            on_submit: Called with the job name as soon as the job is created,
+                       so callers can report it or cancel it later
+            
+        Returns:
+            Enhanced results in the same order as the input prompts.
+            
+        Raises:
+            RuntimeError: If the batch job fails as a whole.
+        """
+        model = self.quality_model
+        results: List[Optional[str]] = [
+            self.cache.get(self._cache_key(model, prompt)) if self.cache is not None else None
+            for prompt in prompts
+        ]
+        misses = [index for index, cached in enumerate(results) if cached is None]
+        
+        embeddings: Dict[int, Optional[List[float]]] = dict.fromkeys(misses)
+        if self.semantic_cache is not None and misses:
+            # One batched embedding call rather than a round trip per prompt
+            vectors = self._embed_many([prompts[index].strip() for index in misses])
+            for index, embedding in zip(misses, vectors):
+                embeddings[index] = embedding
+                results[index] = self._lookup_semantic(model, embedding)
+                
+        pending = [index for index in misses if results[index] is None]
+        if pending:
+            job_name = self.submit_batch([prompts[i] for i in pending])
+            if on_submit is not None:
+                on_submit(job_name)
+            for index, (text, complete) in zip(pending, self.poll_batch(job_name, len(pending), poll_interval)):
+                results[index] = text
+                if complete:
+                    self._store_cached(model, prompts[index], embeddings[index], text)
+                    
+        return [text or "" for text in results]
+
+    def submit_batch(self, prompts: Sequence[str]) -> str:
+        """Submit prompts as a Gemini batch job.
+        
+        The requests are rendered locally into a JSONL file, uploaded through the
+        Files API and referenced by the job.
+        
+        Args:
+            prompts: Basic prompts to enhance
+            
+        Returns:
+            The batch job name, for use with poll_batch.
+            
+        Raises:
+            RuntimeError: If the upload or job creation returns no name.
+        """
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".jsonl", encoding="utf-8", delete=False
+        ) as f:
+            for index, prompt in enumerate(prompts):
+                request = {
+                    "contents": [{"role": "user", "parts": [{"text": self._user_request(prompt)}]}],
+                    "system_instruction": _BATCH_SYSTEM_INSTRUCTION,
+                    "generation_config": {
+                        "thinking_config": {"thinking_budget": self.thinking_budget},
+                        "max_output_tokens": self.max_output_tokens,
+                        "temperature": self.temperature,
+                        "candidate_count": 1,
+                    },
+                }
+                f.write(json.dumps({"key": f"prompt-{index}", "request": request}) + "\n")
+            jsonl_path = f.name
+            
         try:
-            user_request = f"""Transform this basic prompt into 3-5 professional WAN 2.2 video generation prompts with different cinematic approaches:
+            uploaded = self.client.files.upload(
+                file=jsonl_path,
+                config=self._types.UploadFileConfig(display_name="wan-prompt-enhancer", mime_type="jsonl")
+            )
+        finally:
+            os.remove(jsonl_path)
+        if not uploaded.name:
+            raise RuntimeError("batch input upload returned no file name")
+            
+        job = self.client.batches.create(
+            model=self.quality_model,
+            src=uploaded.name,
+            config=self._types.CreateBatchJobConfig(display_name="wan-prompt-enhancer")
+        )
+        if not job.name:
+            raise RuntimeError("batch job was created without a name")
+        return job.name
 
-"{basic_prompt.strip()}"
+    def cancel_batch(self, job_name: str) -> None:
+        """Cancel a running batch job, e.g. when the user stops waiting for it."""
+        self.client.batches.cancel(name=job_name)
 
-Each variation should have different:
-- Lighting setups (sunny, overcast, artificial, etc.)
-- Camera angles and shot sizes
-- Color palettes and moods  
-- Stylistic approaches
-- Motion descriptions
+    def poll_batch(self, job_name: str, count: int, poll_interval: float = 30.0) -> List[Generation]:
+        """Wait for a batch job to finish and return its results.
+        
+        Args:
+            job_name: Name returned by submit_batch
+            count: Number of prompts that were submitted
+            poll_interval: Seconds to wait between job status checks
+            
+        Returns:
+            (text, complete) pairs in submission order. Individual requests that
+            failed, including those of a partially succeeded job, are returned
+            as incomplete error messages.
+            
+        Raises:
+            RuntimeError: If the job fails, is cancelled or expires.
+        """
+        job = self.client.batches.get(name=job_name)
+        while self._job_state(job) not in _BATCH_DONE_STATES:
+            time.sleep(poll_interval)
+            job = self.client.batches.get(name=job_name)
+            
+        state = self._job_state(job)
+        if state not in _BATCH_RESULT_STATES:
+            raise RuntimeError(f"batch job {job_name} ended with state {state}: {job.error}")
+        if job.dest is None:
+            raise RuntimeError(f"batch job {job_name} finished without results")
+            
+        if job.dest.inlined_responses:
+            return [
+                (item.response.text or "", self._finished(item.response.candidates))
+                if item.response
+                else (f"❌ Error generating enhanced prompts: {item.error}", False)
+                for item in job.dest.inlined_responses
+            ]
+        if not job.dest.file_name:
+            raise RuntimeError(f"batch job {job_name} finished without results")
+            
+        by_key: Dict[str, Generation] = {}
+        for line in self.client.files.download(file=job.dest.file_name).decode("utf-8").splitlines():
+            if line.strip():
+                entry = json.loads(line)
+                by_key[entry["key"]] = self._batch_entry_text(entry)
+        return [
+            by_key.get(f"prompt-{index}", ("❌ Error: No result returned for this prompt.", False))
+            for index in range(count)
+        ]
+
+    @staticmethod
+    def _job_state(job: Any) -> str:
+        """Return a batch job's state name, treating a missing state as unknown."""
+        return job.state.name if job.state is not None else "JOB_STATE_UNSPECIFIED"
+
+    @staticmethod
+    def _batch_entry_text(entry: Dict[str, Any]) -> Generation:
+        """Extract the response text from one line of a batch results file."""
+        if "error" in entry:
+            return f"❌ Error generating enhanced prompts: {entry['error']}", False
+        try:
+            candidate = entry["response"]["candidates"][0]
+            text = "".join(part.get("text", "") for part in candidate["content"]["parts"])
+        except (KeyError, IndexError, TypeError):
+            return "❌ Error: Unexpected batch result format.", False
+        return text, candidate.get("finishReason") == "STOP"
 
-Number each variation (1-5) and ensure they're all visually distinct while maintaining the core concept."""
+    @staticmethod
+    def _finished(candidates: Any) -> bool:
+        """Return whether a response ended naturally rather than being cut off."""
+        if not candidates:
+            return False
+        reason = candidates[0].finish_reason
+        return bool(getattr(reason, "name", reason) == "STOP")
 
-            # Create the full prompt by combining system and user prompts
-            full_prompt = f"{SYSTEM_PROMPT}\n\nUser Request: {user_request}"
+    def _user_request(self, basic_prompt: str) -> str:
+        """Build the user message asking for WAN 2.2 variations of a prompt."""
+        return _USER_TEMPLATE.format(prompt=basic_prompt.strip())
+
+    def _lookup_cached(
+        self, model: str, basic_prompt: str, variant: str = ""
+    ) -> Tuple[Optional[str], Optional[List[float]]]:
+        """Check the exact-match and semantic caches for a prompt.
+        
+        Args:
+            model: Model the response would be generated with
+            basic_prompt: The basic prompt to look up
+            variant: Distinguishes result formats that must not share entries
             
+        Returns:
+            A tuple of the cached response (None on a miss) and the prompt
+            embedding, which is reused when storing a freshly generated response.
+        """
+        cache_key = self._cache_key(model, basic_prompt, variant)
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached, None
+                
+        embedding: Optional[List[float]] = None
+        if self.semantic_cache is not None:
+            embedding = self._embed(basic_prompt.strip())
+        return self._lookup_semantic(model, embedding, variant), embedding
+
+    def _lookup_semantic(
+        self, model: str, embedding: Optional[List[float]], variant: str = ""
+    ) -> Optional[str]:
+        """Check the semantic cache with an already computed prompt embedding.
+        
+        Hits are deliberately not copied into the exact-match cache: a near match
+        is only as good as the current threshold, and it must stop being served
+        once WAN_CACHE_SIM is raised or unset.
+        """
+        if self.semantic_cache is None or embedding is None:
+            return None
+        return self.semantic_cache.lookup(self._cache_namespace(model, variant), embedding)
+
+    def _store_cached(
+        self,
+        model: str,
+        basic_prompt: str,
+        embedding: Optional[List[float]],
+        text: str,
+        variant: str = "",
+    ) -> None:
+        """Record a freshly generated response in the enabled caches."""
+        if not text:
+            return
+        if self.cache is not None:
+            self.cache.set(self._cache_key(model, basic_prompt, variant), text)
+        if self.semantic_cache is not None and embedding is not None:
+            self.semantic_cache.add(self._cache_namespace(model, variant), embedding, text)
+
+    def _generate(self, model: str, user_request: str, stream: bool = False) -> Generation:
+        """Send a user request to Gemini and return the response text and completeness.
+        
+        SYSTEM_PROMPT travels separately as the system instruction, so the prefix
+        stays identical across calls and Gemini's implicit caching can reuse it.
+        When streaming, chunks are echoed to stdout as they arrive; a stream that
+        fails partway raises after flagging the partial output.
+        """
+        if not stream:
             response = self.client.models.generate_content(
-                model=self.model,
-                contents=full_prompt,
-                config=types.GenerateContentConfig(
-                    thinking_config=types.ThinkingConfig(thinking_budget=self.thinking_budget)
-                )
+                model=model,
+                contents=user_request,
+                config=self._gen_config
             )
+            return response.text or "", self._finished(response.candidates)
             
-            return response.text
-            
-        except Exception as e:
-            return f"❌ Error generating enhanced prompts: {e}\nPlease check your API key and internet connection."
+        chunks: List[str] = []
+        complete = False
+        try:
+            for chunk in self.client.models.generate_content_stream(
+                model=model,
+                contents=user_request,
+                config=self._gen_config
+            ):
+                if chunk.text:
+                    sys.stdout.write(chunk.text)
+                    sys.stdout.flush()
+                    chunks.append(chunk.text)
+                if chunk.candidates and chunk.candidates[0].finish_reason:
+                    # The final chunk carries the finish reason
+                    complete = self._finished(chunk.candidates)
+        except Exception:
+            # Text already on screen can't be taken back, so a failed stream is
+            # never retried; mark where it stopped before the error is shown
+            if chunks:
+                sys.stdout.write("\n⚠️  Stream interrupted; the output above is incomplete.\n")
+                sys.stdout.flush()
+            raise
+        sys.stdout.write("\n")
+        return "".join(chunks), complete
+
+    @staticmethod
+    def _emit(text: str, stream: bool) -> str:
+        """Print text that didn't come from a stream when streaming, then return it."""
+        if stream:
+            print(text)
+        return text
+
+    async def _generate_async(self, model: str, user_request: str) -> Generation:
+        """Async counterpart of _generate using the client's aio surface."""
+        response = await self.client.aio.models.generate_content(
+            model=model,
+            contents=user_request,
+            config=self._gen_config
+        )
+        return response.text or "", self._finished(response.candidates)
 
 def main() -> None:
     """Main entry point for the WAN 2.2 Prompt Enhancer CLI application.
     
     Handles command-line argument parsing and orchestrates the prompt enhancement
-    workflow in either single-prompt or interactive mode.
+    workflow in single-prompt, interactive or batch mode.
     """
     parser = argparse.ArgumentParser(
         prog="wan-enhancer",
@@ -183,6 +1093,8 @@ def main() -> None:
   python wan_prompt_enhancer.py "a dragon flying over mountains"
   python wan_prompt_enhancer.py "dancing in the rain" --api-key YOUR_KEY
   python wan_prompt_enhancer.py --interactive
+  python wan_prompt_enhancer.py --batch prompts.txt
+  python wan_prompt_enhancer.py --batch-file prompts.txt --output enhanced.jsonl
   
   # With uv (recommended):
   uv run wan_prompt_enhancer.py "mystical forest scene"
@@ -207,8 +1119,9 @@ def main() -> None:
     )
     
     parser.add_argument(
-        "--model",
-        help="Gemini model to use (alternatively set GEMINI_MODEL in .env file)",
+        "--model", "--force-model",
+        help="Gemini model to use for every prompt, turning off short-prompt routing to "
+             "GEMINI_FAST_MODEL (alternatively set GEMINI_MODEL in .env file, which keeps routing)",
         default=None,
         metavar="MODEL"
     )
@@ -219,6 +1132,71 @@ def main() -> None:
         help="Run in interactive mode for continuous prompt enhancement"
     )
     
+    parser.add_argument(
+        "--stream",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Print variations as they are generated (default: on, except in batch modes)"
+    )
+    
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=None,
+        help=f"Request N variations (max: {len(STYLE_DIRECTIVES)}) as separate concurrent calls for lower latency",
+        metavar="N"
+    )
+    
+    parser.add_argument(
+        "--prefetch",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="In interactive mode, pre-enhance likely follow-up prompts while you type "
+             "(requires WAN_CACHE_SIM; uses extra tokens)"
+    )
+    
+    parser.add_argument(
+        "--batch",
+        help="Enhance every prompt in FILE (one per line) concurrently",
+        default=None,
+        metavar="FILE"
+    )
+    
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of simultaneous requests in --batch mode (default: 8)",
+        metavar="N"
+    )
+    
+    parser.add_argument(
+        "--batch-file",
+        help="Enhance every prompt in FILE (one per line) as a discounted Gemini batch job",
+        default=None,
+        metavar="FILE"
+    )
+    
+    parser.add_argument(
+        "--output", "-o",
+        help="Write --batch/--batch-file results to FILE as JSON lines instead of printing them",
+        default=None,
+        metavar="FILE"
+    )
+    
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call Gemini instead of reusing responses for repeated prompts"
+    )
+    
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory for cached responses (alternatively set WAN_CACHE_DIR in .env file)",
+        default=None,
+        metavar="DIR"
+    )
+    
     parser.add_argument(
         "--version", "-v",
         action="version",
@@ -226,23 +1204,57 @@ def main() -> None:
     )
 
     args = parser.parse_args()
+    
+    if args.parallel is not None:
+        if args.stream:
+            parser.error("--stream can't be combined with --parallel, which waits for every variation")
+        if args.batch or args.batch_file:
+            parser.error("--parallel can't be combined with --batch or --batch-file")
+
+    # Bail out before initializing the client when there is nothing to enhance
+    if not (args.interactive or args.batch or args.batch_file or args.prompt):
+        print("🎬 WAN 2.2 Prompt Enhancer")
+        print("Transform basic prompts into professional cinematic video generation prompts.\n")
+        parser.print_help()
+        print("\n⚠️  Please provide a prompt or use --interactive, --batch or --batch-file mode")
+        print("💡 Quick start: python wan_prompt_enhancer.py 'your prompt here'")
+        sys.exit(1)
 
     # Initialize enhancer
-    enhancer = PromptEnhancer(api_key=args.api_key, model=args.model)
+    enhancer = PromptEnhancer(
+        api_key=args.api_key,
+        model=args.model,
+        use_cache=not args.no_cache,
+        cache_dir=args.cache_dir,
+        route=args.model is None,
+    )
+    
+    # Streaming only applies to the single-prompt and interactive modes, and is
+    # unavailable when variations are generated in parallel
+    stream = args.stream is not False and args.parallel is None
+    
+    def enhance(prompt: str) -> str:
+        if args.parallel is not None:
+            return enhancer.run(enhancer.enhance_prompt_parallel(prompt, n=args.parallel))
+        return enhancer.enhance_prompt(prompt, stream=stream)
 
     if args.interactive:
         print("🎬 WAN 2.2 Prompt Enhancer - Interactive Mode")
         print("Transform basic prompts into professional cinematic video generation prompts.")
-        print(f"🤖 Using model: {enhancer.model}")
+        if enhancer.fast_model:
+            print(f"🤖 Using model: {enhancer.quality_model} (short prompts: {enhancer.fast_model})")
+        else:
+            print(f"🤖 Using model: {enhancer.model}")
         print("💡 Tips: Be descriptive but concise. Examples: 'cat playing piano', 'storm over ocean'")
         print("🚪 Type 'quit', 'exit', or press Ctrl+C to stop.\n")
+        enhancer.warmup()
         
         prompt_count = 0
         while True:
             try:
                 user_input = input("📝 Enter your basic prompt: ").strip()
                 
-                if user_input.lower() in ['quit', 'exit', 'q', 'stop']:
+                if user_input.lower() in _EXIT_WORDS:
                     print(f"\n👋 Thanks for using WAN 2.2 Prompt Enhancer! Enhanced {prompt_count} prompts.")
                     break
                     
@@ -254,37 +1266,101 @@ def main() -> None:
                 print("✨ Generating cinematic variations...")
                 print("=" * 60)
                 
-                enhanced = enhancer.enhance_prompt(user_input)
-                print(enhanced)
+                enhanced = enhance(user_input)
+                if not stream:
+                    print(enhanced)
                 print("=" * 60)
                 
                 prompt_count += 1
                 print(f"✅ Enhanced prompt #{prompt_count}. Ready for your next prompt!\n")
                 
+                if args.prefetch and args.parallel is None:
+                    enhancer.prefetch(user_input)
+                
             except KeyboardInterrupt:
                 print(f"\n\n👋 Thanks for using WAN 2.2 Prompt Enhancer! Enhanced {prompt_count} prompts.")
                 break
             except Exception as e:
                 print(f"❌ Unexpected error: {e}")
                 print("Please try again or restart the application.\n")
+                
+        # Let a background prefetch finish its cache write instead of killing it
+        enhancer.stop_prefetch()
     
+    elif args.batch or args.batch_file:
+        batch_path = args.batch or args.batch_file
+        try:
+            with open(batch_path, encoding="utf-8") as f:
+                prompts = [line.strip() for line in f if line.strip()]
+        except OSError as e:
+            print(f"❌ Error reading batch file: {e}")
+            sys.exit(1)
+            
+        if not prompts:
+            print(f"⚠️  No prompts found in {batch_path}")
+            sys.exit(1)
+            
+        print(f"✨ Generating cinematic variations for {len(prompts)} prompts...")
+        if args.batch:
+            results = enhancer.run(enhancer.enhance_batch(prompts, concurrency=max(1, args.concurrency)))
+        else:
+            print("⏳ Submitting as a Gemini batch job; results can take a while...")
+            submitted: List[str] = []
+            
+            def announce(job_name: str) -> None:
+                submitted.append(job_name)
+                print(f"📦 Batch job: {job_name} (press Ctrl+C to stop waiting)")
+                
+            try:
+                results = enhancer.enhance_batch_job(prompts, on_submit=announce)
+            except KeyboardInterrupt:
+                if not submitted:
+                    raise
+                try:
+                    answer = input(f"\n⚠️  Stopped waiting. Cancel batch job {submitted[0]}? [y/N]: ")
+                except (EOFError, KeyboardInterrupt):
+                    answer = ""
+                if answer.strip().lower() in ("y", "yes"):
+                    try:
+                        enhancer.cancel_batch(submitted[0])
+                        print(f"🛑 Cancelled batch job {submitted[0]}.")
+                    except Exception as e:
+                        print(f"❌ Error cancelling batch job: {e}")
+                else:
+                    print(f"⏳ Batch job {submitted[0]} keeps running on Gemini's side.")
+                sys.exit(1)
+            except Exception as e:
+                print(f"❌ Error running batch job: {e}")
+                sys.exit(1)
+                
+        if args.output:
+            try:
+                with open(args.output, "w", encoding="utf-8") as f:
+                    for prompt, enhanced in zip(prompts, results):
+                        f.write(json.dumps({"prompt": prompt, "enhanced": enhanced}) + "\n")
+            except OSError as e:
+                print(f"❌ Error writing output file: {e}")
+                sys.exit(1)
+            print(f"✅ Batch complete! Wrote {len(prompts)} enhanced prompts to {args.output}.")
+        else:
+            for prompt, enhanced in zip(prompts, results):
+                print("=" * 60)
+                print(f"🎯 Enhanced: '{prompt}'")
+                print("=" * 60)
+                print(enhanced)
+            print("=" * 60)
+            print(f"✅ Batch complete! Enhanced {len(prompts)} prompts.")
+        
     elif args.prompt:
         print(f"🎯 Enhancing: '{args.prompt}'")
         print("✨ Generating cinematic variations...")
         print("=" * 60)
         
-        enhanced = enhancer.enhance_prompt(args.prompt)
-        print(enhanced)
+        enhanced = enhance(args.prompt)
+        if not stream:
+            print(enhanced)
         print("=" * 60)
         print("✅ Enhancement complete! Use these prompts in your video generation tool.")
-        
-    else:
-        print("🎬 WAN 2.2 Prompt Enhancer")
-        print("Transform basic prompts into professional cinematic video generation prompts.\n")
-        parser.print_help()
-        print("\n⚠️  Please provide a prompt or use --interactive mode")
-        print("💡 Quick start: python wan_prompt_enhancer.py 'your prompt here'")
-        sys.exit(1)
 
 if __name__ == "__main__":
     try: